@@ -0,0 +1,92 @@
+"""
+Time-domain YIN kernels for pitch_detector's method='direct'.
+
+pitch_detector imports this module only when the direct method is first
+used, so Numba's import and compile cost is not paid by the default FFT path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional; the kernels then run as plain Python
+    prange = range
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def yin_frame(frame, lag_min, lag_max, threshold, sr):
+    """
+    Reference (time-domain) YIN estimate for a single frame.
+    
+    Args:
+        frame (np.array): Frame samples
+        lag_min (int): Smallest lag considered
+        lag_max (int): Upper bound (exclusive) of the lag range
+        threshold (float): Threshold for pitch detection
+        sr (int): Sample rate in Hz
+    
+    Returns:
+        float: Detected pitch in Hz (0.0 = no pitch detected)
+    """
+    frame_length = frame.shape[0]
+    
+    # Step 1: Difference function
+    diff = np.zeros(lag_max, dtype=np.float32)
+    for lag in range(lag_min, lag_max):
+        acc = np.float32(0.0)
+        for j in range(frame_length - lag):
+            delta = frame[j] - frame[j + lag]
+            acc += delta * delta
+        diff[lag] = acc
+    
+    # Step 2: Cumulative mean normalized difference
+    cmnd = np.ones(lag_max, dtype=np.float32)
+    cumsum = np.float32(0.0)
+    for lag in range(lag_min, lag_max):
+        cumsum += diff[lag]
+        if cumsum > 0:
+            cmnd[lag] = diff[lag] / (cumsum / lag)
+    
+    # Step 3: Absolute threshold
+    pitch_lag = -1
+    for lag in range(lag_min, lag_max):
+        if cmnd[lag] < threshold:
+            pitch_lag = lag
+            break
+    
+    # Step 4: Parabolic interpolation for accuracy
+    if lag_min < pitch_lag < lag_max - 1:
+        alpha = cmnd[pitch_lag - 1]
+        beta = cmnd[pitch_lag]
+        gamma = cmnd[pitch_lag + 1]
+        
+        if alpha > beta and gamma > beta:
+            peak_offset = 0.5 * (alpha - gamma) / (alpha - 2 * beta + gamma)
+            return sr / (pitch_lag + peak_offset)
+        return sr / pitch_lag
+    return 0.0
+
+
+@njit(cache=True, parallel=True)
+def yin_direct(audio_samples, sr, frame_length, hop_length, n_frames,
+               frame_indices, lag_min, lag_max, threshold):
+    """
+    Run the reference YIN estimate over the given frames in parallel.
+    
+    Returns:
+        np.array: Detected pitch per frame in Hz (0 = no pitch detected or
+                  frame not analysed)
+    """
+    pitches = np.zeros(n_frames, dtype=np.float32)
+    for k in prange(len(frame_indices)):
+        frame_idx = frame_indices[k]
+        start = frame_idx * hop_length
+        pitches[frame_idx] = yin_frame(audio_samples[start:start + frame_length],
+                                       lag_min, lag_max, threshold, sr)
+    return pitches
@@ -7,49 +7,296 @@ Optimized for memory efficiency with 8GB RAM systems.
 """
 
 import os
+import re
 import sys
+import shutil
+import hashlib
+import importlib.util
 import subprocess
+import tempfile
 import numpy as np
 import gc
+from concurrent.futures import ProcessPoolExecutor
+from math import gcd
 from scipy.io import wavfile
 
 
+# moviepy's VideoFileClip class, imported on first use
+_VideoFileClip = None
+
+# Set once check_dependencies() has found every dependency
+_dependencies_checked = False
+
+# Bytes read from the ffmpeg pipe per call (1M float32 samples)
+_FFMPEG_CHUNK_BYTES = 4 * (1 << 20)
+
+# Supported input extensions
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.mov', '.avi', '.mkv'})
+AUDIO_EXTENSIONS = frozenset({'.wav', '.mp3', '.flac', '.ogg'})
+
+
+def _get_video_file_clip():
+    """
+    Import moviepy's VideoFileClip on first use and cache it.
+    
+    Returns:
+        type: The VideoFileClip class from moviepy 2.x or 1.x
+    """
+    global _VideoFileClip
+    if _VideoFileClip is None:
+        try:
+            # Try moviepy 2.x style import
+            from moviepy import VideoFileClip
+        except ImportError:
+            # Fall back to moviepy 1.x style import
+            from moviepy.editor import VideoFileClip
+        _VideoFileClip = VideoFileClip
+    return _VideoFileClip
+
+
 def check_dependencies():
     """
     Check and install required dependencies if missing.
     
+    A successful check is remembered, so later calls in the same session
+    return immediately.
+    
     Returns:
         bool: True if all dependencies are available, False otherwise
     """
-    libraries = ['moviepy', 'numpy', 'scipy', 'matplotlib', 'librosa']
+    global _dependencies_checked
+    if _dependencies_checked:
+        return True
+    
+    libraries = ['moviepy', 'numpy', 'scipy', 'matplotlib', 'librosa', 'soundfile']
     
     print("Checking environment dependencies...")
     all_available = True
     
     for lib in libraries:
-        try:
-            __import__(lib)
+        # Locate the package without importing it (importing librosa alone
+        # pulls in numba and takes seconds)
+        if importlib.util.find_spec(lib) is not None:
             print(f"✅ {lib} is installed.")
-        except ImportError:
+        else:
             print(f"❌ {lib} missing. Installing now...")
             try:
                 subprocess.check_call([sys.executable, "-m", "pip", "install", lib])
+                importlib.invalidate_caches()
                 print(f"✅ {lib} installed successfully.")
             except subprocess.CalledProcessError:
                 print(f"⚠️ Failed to install {lib}. Please install manually.")
                 all_available = False
     
+    _dependencies_checked = all_available
     return all_available
 
 
-def prepare_audio_input(file_path, target_sr=22050):
+def _read_audio_soundfile(load_path, block_size=65536):
+    """
+    Stream an audio file through soundfile (libsndfile).
+    
+    Blocks are decoded straight to float32 and downmixed to mono into a
+    pre-allocated buffer, so the multi-channel file is never held in memory.
+    
+    Args:
+        load_path (str): Path to audio file
+        block_size (int): Number of frames decoded per block (default: 65536)
+    
+    Returns:
+        tuple: (samples, sample_rate, peak_normalize) where peak_normalize is
+               True when the source is not fixed-point PCM
+    """
+    import soundfile as sf
+    
+    info = sf.info(load_path)
+    if info.channels > 1:
+        print(f"Converting stereo to mono...")
+    
+    samples = np.empty(info.frames, dtype=np.float32)
+    pos = 0
+    for block in sf.blocks(load_path, blocksize=block_size, dtype='float32',
+                           always_2d=False):
+        end = pos + len(block)
+        if end > len(samples):
+            # Header under-reported the frame count; grow the buffer
+            samples = np.resize(samples, end)
+        if block.ndim > 1:
+            np.mean(block, axis=1, out=samples[pos:end])
+        else:
+            samples[pos:end] = block
+        pos = end
+    
+    return samples[:pos], info.samplerate, not info.subtype.startswith('PCM')
+
+
+def _read_audio_wavfile(load_path):
+    """
+    Load a WAV file with scipy.io.wavfile (fallback when soundfile is missing).
+    
+    Args:
+        load_path (str): Path to WAV file
+    
+    Returns:
+        tuple: (samples, sample_rate, peak_normalize) where peak_normalize is
+               True when the source is floating point
+    """
+    sr, data = wavfile.read(load_path)
+    
+    # Convert to Mono if Stereo
+    if len(data.shape) > 1:
+        print(f"Converting stereo to mono...")
+        if data.dtype in [np.int16, np.int32]:
+            # Average channels in a wider integer type instead of the
+            # float64 buffer that mean() would allocate
+            acc_dtype = np.int32 if data.dtype == np.int16 else np.int64
+            mono = data.sum(axis=1, dtype=acc_dtype)
+            mono //= data.shape[1]
+            data = mono.astype(data.dtype)
+            del mono
+        else:
+            data = data.mean(axis=1)
+    
+    # Memory-safe conversion to float32
+    if data.dtype in [np.int16, np.int32]:
+        # Integer audio data - cast and scale by type max in a single pass
+        info = np.iinfo(data.dtype)
+        scale = np.float32(1.0 / max(abs(info.min), abs(info.max)))
+        samples = np.multiply(data, scale, dtype=np.float32)
+        return samples, sr, False
+    
+    return data.astype(np.float32, copy=False), sr, True
+
+
+def _find_ffmpeg():
+    """
+    Locate an ffmpeg executable on PATH or the one bundled with imageio-ffmpeg.
+    
+    Returns:
+        str: Path to ffmpeg, or None if it is not available
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        try:
+            import imageio_ffmpeg
+            ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            ffmpeg = None
+    return ffmpeg
+
+
+def _probe_duration(ffmpeg, file_path):
+    """
+    Read a media file's duration from the header ffmpeg prints for it.
+    
+    Args:
+        ffmpeg (str): Path to ffmpeg executable
+        file_path (str): Path to input media file
+    
+    Returns:
+        float: Duration in seconds, or None if ffmpeg did not report one
+    """
+    proc = subprocess.run([ffmpeg, '-nostdin', '-hide_banner', '-i', file_path],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    match = re.search(rb'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', proc.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _extract_audio_ffmpeg(ffmpeg, file_path, target_sr):
+    """
+    Decode the audio track of a video straight to mono float32 through a pipe.
+    
+    ffmpeg downmixes and resamples to target_sr itself and writes raw 32-bit
+    float samples to stdout, so no temporary WAV file is written or re-read.
+    The output array is preallocated from the probed duration and filled one
+    chunk at a time, so decoding needs no memory beyond the result itself.
+    
+    Args:
+        ffmpeg (str): Path to ffmpeg executable
+        file_path (str): Path to input video file
+        target_sr (int): Target sample rate in Hz
+    
+    Returns:
+        np.array: Mono float32 samples at target_sr
+    
+    Raises:
+        ValueError: If ffmpeg fails or the video has no audio track
+    """
+    # One second of slack covers rounding in the reported duration
+    duration = _probe_duration(ffmpeg, file_path)
+    capacity = int((duration or 0) * target_sr) + target_sr
+    samples = np.empty(capacity, dtype=np.float32)
+    
+    cmd = [ffmpeg, '-nostdin', '-v', 'error', '-i', file_path, '-vn',
+           '-f', 'f32le', '-ac', '1', '-ar', str(target_sr), '-']
+    # stderr goes to a file: -v error still logs one line per bad packet,
+    # and an undrained stderr pipe would block ffmpeg while stdout is read
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        
+        n_bytes = 0
+        try:
+            while True:
+                if n_bytes == samples.nbytes:
+                    # Duration was missing or under-reported; grow the buffer
+                    samples = np.resize(samples, 2 * len(samples))
+                view = memoryview(samples).cast('B')
+                count = proc.stdout.readinto(view[n_bytes:n_bytes + _FFMPEG_CHUNK_BYTES])
+                if not count:
+                    break
+                n_bytes += count
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    
+    if proc.returncode != 0:
+        raise ValueError(stderr.decode(errors='replace').strip())
+    if n_bytes == 0:
+        raise ValueError(f"Video file has no audio track: {file_path}")
+    
+    return samples[:n_bytes // 4]
+
+
+def _cache_path(file_path, target_sr, cache_dir):
+    """
+    Build the cache file path for a prepared input.
+    
+    The key covers the absolute path, size and modification time of the
+    source, so editing or replacing the file invalidates its cache entry.
+    
+    Args:
+        file_path (str): Path to input video or audio file
+        target_sr (int): Target sample rate in Hz
+        cache_dir (str): Directory holding cached inputs
+    
+    Returns:
+        str: Path of the .npz cache file
+    """
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{target_sr}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.npz")
+
+
+def prepare_audio_input(file_path, target_sr=22050, cache_dir=None):
     """
     Extract audio from video if needed and load it into memory.
     Optimized for 8GB RAM using float32 and downsampling.
     
     Args:
         file_path (str): Path to input video or audio file
-        target_sr (int): Target sample rate in Hz (default: 22050)
+        target_sr (int): Target sample rate in Hz (default: 22050). Pitch
+                         tracking up to 800 Hz also works at 11025 Hz with
+                         half the frame and hop sizes, at about half the cost
+        cache_dir (str): Directory for caching prepared audio between runs
+                         (default: None, no caching). A cached result is
+                         reused until the source file changes
     
     Returns:
         tuple: (samples, sample_rate) where samples is a numpy array of audio data
@@ -62,86 +309,138 @@ def prepare_audio_input(file_path, target_sr=22050):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Input file not found: {file_path}")
     
-    # Import moviepy only when needed (lazy import)
-    try:
-        # Try moviepy 2.x style import
-        from moviepy import VideoFileClip
-    except ImportError:
-        # Fall back to moviepy 1.x style import
-        from moviepy.editor import VideoFileClip
-    
     ext = os.path.splitext(file_path)[1].lower()
-    temp_audio = "temp_extracted_audio.wav"
+    # Per-process name so parallel batch workers don't share a temp file
+    temp_audio = f"temp_extracted_audio_{os.getpid()}.wav"
+    
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = _cache_path(file_path, target_sr, cache_dir)
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                samples, sr = cached['samples'], int(cached['sr'])
+            print(f"✅ Loaded {len(samples) / sr:.2f}s of cached audio at {sr}Hz.")
+            return samples, sr
     
     # Step 1: Video to Audio Extraction (If needed)
-    if ext in ['.mp4', '.mov', '.avi', '.mkv']:
+    if ext in VIDEO_EXTENSIONS:
         print(f"Video detected. Extracting audio from {file_path}...")
-        try:
-            video = VideoFileClip(file_path)
-            if video.audio is None:
-                raise ValueError(f"Video file has no audio track: {file_path}")
-            video.audio.write_audiofile(temp_audio, fps=target_sr, logger=None)
-            video.close()  # Close file handle immediately
-            load_path = temp_audio
-            del video
-        except Exception as e:
-            if os.path.exists(temp_audio):
-                os.remove(temp_audio)
-            raise ValueError(f"Failed to extract audio from video: {e}")
-    elif ext in ['.wav', '.mp3', '.flac', '.ogg']:
+        ffmpeg = _find_ffmpeg()
+        if ffmpeg is not None:
+            # Decode, downmix and resample in one ffmpeg pass
+            try:
+                samples = _extract_audio_ffmpeg(ffmpeg, file_path, target_sr)
+            except Exception as e:
+                raise ValueError(f"Failed to extract audio from video: {e}")
+            sr = target_sr
+            peak_normalize = False
+            load_path = None
+        else:
+            try:
+                video = _get_video_file_clip()(file_path)
+                if video.audio is None:
+                    raise ValueError(f"Video file has no audio track: {file_path}")
+                video.audio.write_audiofile(temp_audio, fps=target_sr, logger=None)
+                video.close()  # Close file handle immediately
+                load_path = temp_audio
+                del video
+            except Exception as e:
+                if os.path.exists(temp_audio):
+                    os.remove(temp_audio)
+                raise ValueError(f"Failed to extract audio from video: {e}")
+    elif ext in AUDIO_EXTENSIONS:
         load_path = file_path
     else:
         raise ValueError(f"Unsupported file format: {ext}. "
-                        f"Supported formats: .mp4, .mov, .avi, .mkv, .wav, .mp3, .flac, .ogg")
+                        f"Supported formats: {', '.join(sorted(VIDEO_EXTENSIONS | AUDIO_EXTENSIONS))}")
 
-    # Step 2: Load and Downsample
-    print(f"Loading and normalizing audio...")
-    try:
-        sr, data = wavfile.read(load_path)
-    except Exception as e:
-        if os.path.exists(temp_audio) and ext in ['.mp4', '.mov', '.avi', '.mkv']:
-            os.remove(temp_audio)
-        raise ValueError(f"Failed to load audio file: {e}")
-    
-    # Convert to Mono if Stereo
-    if len(data.shape) > 1:
-        print(f"Converting stereo to mono...")
-        data = data.mean(axis=1)
+    # Step 2: Load as mono float32
+    if load_path is not None:
+        print(f"Loading and normalizing audio...")
+        try:
+            try:
+                samples, sr, peak_normalize = _read_audio_soundfile(load_path)
+            except ImportError:
+                samples, sr, peak_normalize = _read_audio_wavfile(load_path)
+        except Exception as e:
+            if os.path.exists(temp_audio) and ext in VIDEO_EXTENSIONS:
+                os.remove(temp_audio)
+            raise ValueError(f"Failed to load audio file: {e}")
     
-    # Downsample logic (Simple decimation for speed)
-    if sr != target_sr:
+    # Downsample with a polyphase anti-aliasing filter (never upsample)
+    if sr > target_sr:
+        # scipy.signal is slow to import, so only load it when resampling
+        from scipy.signal import resample_poly
         print(f"Resampling from {sr}Hz to {target_sr}Hz...")
-        resample_factor = max(1, sr // target_sr)
-        data = data[::resample_factor]
-        sr = sr // resample_factor
+        g = gcd(sr, target_sr)
+        samples = resample_poly(samples, target_sr // g, sr // g).astype(np.float32, copy=False)
+        sr = target_sr
     
-    # Memory-safe conversion to float32
-    if data.dtype in [np.int16, np.int32]:
-        # Integer audio data - normalize by type max
-        info = np.iinfo(data.dtype)
-        samples = data.astype(np.float32) / max(abs(info.min), abs(info.max))
-    else:
-        # Already float - just convert and normalize
-        samples = data.astype(np.float32)
-        max_val = np.max(np.abs(samples))
-        if max_val > 0:
-            samples /= max_val
+    # Float or compressed sources are normalized to peak; fixed-scale sources
+    # are only scaled down if decoding pushed them past full scale
+    # Peak from max/min reductions avoids allocating an np.abs() copy
+    max_val = max(samples.max(initial=0.0), -samples.min(initial=0.0))
+    if max_val > 0 and (peak_normalize or max_val > 1.0):
+        samples *= np.float32(1.0 / max_val)
     
     # Cleanup
-    if os.path.exists(temp_audio) and ext in ['.mp4', '.mov', '.avi', '.mkv']:
+    if os.path.exists(temp_audio) and ext in VIDEO_EXTENSIONS:
         os.remove(temp_audio)
     
-    del data
     gc.collect()
     
+    if cache_file is not None:
+        # Write under a temporary name so readers never see a partial file
+        os.makedirs(cache_dir, exist_ok=True)
+        partial = f"{cache_file}.{os.getpid()}.tmp.npz"
+        np.savez(partial, samples=samples, sr=sr)
+        os.replace(partial, cache_file)
+    
     duration = len(samples) / sr
     print(f"✅ Done. Loaded {duration:.2f}s of audio at {sr}Hz.")
     print(f"   Audio shape: {samples.shape}, dtype: {samples.dtype}")
-    print(f"   Value range: [{samples.min():.3f}, {samples.max():.3f}]")
+    if len(samples):
+        print(f"   Value range: [{samples.min():.3f}, {samples.max():.3f}]")
     
     return samples, sr
 
 
+def prepare_audio_inputs(file_paths, target_sr=22050, max_workers=None, cache_dir=None):
+    """
+    Prepare several audio/video files, decoding them in parallel processes.
+    
+    Each file is loaded with prepare_audio_input() in its own worker, so
+    decoding and resampling of independent files run on separate cores.
+    
+    Args:
+        file_paths (list): Paths to input video or audio files
+        target_sr (int): Target sample rate in Hz (default: 22050)
+        max_workers (int): Number of worker processes (default: one per CPU);
+                           1 loads the files sequentially in this process
+        cache_dir (str): Directory for caching prepared audio between runs
+                         (default: None, no caching)
+    
+    Returns:
+        list: (samples, sample_rate) tuples in the same order as file_paths
+    
+    Raises:
+        FileNotFoundError: If an input file doesn't exist
+        ValueError: If a file format is not supported
+    """
+    file_paths = list(file_paths)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(file_paths))
+    
+    if max_workers <= 1:
+        return [prepare_audio_input(path, target_sr, cache_dir) for path in file_paths]
+    
+    n_files = len(file_paths)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(prepare_audio_input, file_paths,
+                                 [target_sr] * n_files, [cache_dir] * n_files))
+
+
 def get_audio_info(file_path):
     """
     Get basic information about an audio/video file without loading it fully.
@@ -155,11 +454,6 @@ def get_audio_info(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     
-    try:
-        from moviepy import VideoFileClip
-    except ImportError:
-        from moviepy.editor import VideoFileClip
-    
     ext = os.path.splitext(file_path)[1].lower()
     info = {
         'path': file_path,
@@ -167,9 +461,9 @@ def get_audio_info(file_path):
         'size_mb': os.path.getsize(file_path) / (1024 * 1024)
     }
     
-    if ext in ['.mp4', '.mov', '.avi', '.mkv']:
+    if ext in VIDEO_EXTENSIONS:
         try:
-            video = VideoFileClip(file_path)
+            video = _get_video_file_clip()(file_path)
             info['duration'] = video.duration
             info['has_audio'] = video.audio is not None
             if video.audio:
@@ -179,10 +473,18 @@ def get_audio_info(file_path):
             info['error'] = str(e)
     else:
         try:
-            sr, data = wavfile.read(file_path)
-            info['sample_rate'] = sr
-            info['duration'] = len(data) / sr
-            info['channels'] = 1 if len(data.shape) == 1 else data.shape[1]
+            try:
+                import soundfile as sf
+                file_info = sf.info(file_path)
+                info['sample_rate'] = file_info.samplerate
+                info['duration'] = file_info.frames / file_info.samplerate
+                info['channels'] = file_info.channels
+            except ImportError:
+                # Memory-map so only the header is actually read
+                sr, data = wavfile.read(file_path, mmap=True)
+                info['sample_rate'] = sr
+                info['duration'] = len(data) / sr
+                info['channels'] = 1 if len(data.shape) == 1 else data.shape[1]
         except Exception as e:
             info['error'] = str(e)
     
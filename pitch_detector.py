@@ -5,12 +5,75 @@ This module implements the YIN algorithm for accurate pitch detection
 and note segmentation, optimized for musical analysis.
 """
 
+import math
+from dataclasses import dataclass, fields
+
 import numpy as np
-from scipy.signal import medfilt
+from scipy.fft import rfft, irfft
+from scipy.ndimage import median_filter
+
+# Number of frames transformed per batched FFT call (bounds peak memory)
+_YIN_BLOCK_FRAMES = 1024
+
+# Pitch-class letters indexed by MIDI number modulo 12
+_NOTE_LETTERS = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+_NOTE_LETTER_ARRAY = np.array(_NOTE_LETTERS)
+
+# Note names for the full MIDI range, indexed by MIDI number
+_MIDI_NOTE_NAMES = tuple(f"{_NOTE_LETTERS[m % 12]}{m // 12 - 1}" for m in range(128))
+_MIDI_NOTE_NAME_ARRAY = np.array(_MIDI_NOTE_NAMES)
+
+
+def _cumulative_mean_normalized_difference(frames, lag_min, lag_max):
+    """
+    Compute the YIN cumulative mean normalized difference for a batch of frames.
+    
+    The difference function is expanded as
+        d(lag) = sum(x[j]^2, j < W-lag) + sum(x[j]^2, j >= lag) - 2*r(lag)
+    with the autocorrelation r of every frame computed by one zero-padded FFT.
+    
+    Args:
+        frames (np.array): 2-D array of shape (n_frames, frame_length)
+        lag_min (int): Smallest lag considered
+        lag_max (int): Upper bound (exclusive) of the lag range
+    
+    Returns:
+        np.array: Array of shape (n_frames, lag_max); entries below lag_min are 1
+    """
+    frames = frames.astype(np.float32, copy=False)
+    n_frames, frame_length = frames.shape
+    
+    # Step 1: Difference function (single precision: complex64 FFTs)
+    spectrum = rfft(frames, n=2 * frame_length, axis=1, workers=-1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    del spectrum
+    # Lags of W or more have no overlapping samples (d = 0), and beyond W the
+    # circular result holds wrapped negative lags, so keep only lags < W
+    n_acf = min(lag_max, frame_length)
+    acf = irfft(power, n=2 * frame_length, axis=1, workers=-1)[:, :n_acf]
+    del power
+    
+    energy = np.zeros((n_frames, frame_length + 1), dtype=np.float32)
+    np.cumsum(np.square(frames), axis=1, out=energy[:, 1:])
+    lags = np.arange(lag_max)
+    diff = (energy[:, np.maximum(frame_length - lags, 0)]
+            + (energy[:, -1:] - energy[:, np.minimum(lags, frame_length)]))
+    diff[:, :n_acf] -= 2 * acf
+    np.maximum(diff, 0.0, out=diff)  # clamp FFT round-off
+    
+    # Step 2: Cumulative mean normalized difference
+    cmnd = np.ones((n_frames, lag_max), dtype=np.float32)
+    cumsum = np.cumsum(diff[:, lag_min:], axis=1)
+    lag_weights = np.arange(lag_min, lag_max, dtype=np.float32)
+    np.divide(diff[:, lag_min:] * lag_weights, cumsum,
+              out=cmnd[:, lag_min:], where=cumsum > 0)
+    
+    return cmnd
 
 
 def yin_pitch_detection(audio_samples, sr, frame_length=2048, hop_length=512, 
-                        threshold=0.1, freq_min=80, freq_max=800):
+                        threshold=0.1, freq_min=80, freq_max=800, method='fft',
+                        silence_db=-40.0):
     """
     Implement the YIN algorithm for pitch detection.
     
@@ -25,71 +88,87 @@ def yin_pitch_detection(audio_samples, sr, frame_length=2048, hop_length=512,
         threshold (float): Threshold for pitch detection (default: 0.1)
         freq_min (float): Minimum frequency to detect in Hz (default: 80)
         freq_max (float): Maximum frequency to detect in Hz (default: 800)
+        method (str): 'fft' for the batched FFT implementation (default) or
+                      'direct' for the reference time-domain loops, compiled
+                      with Numba when it is installed
+        silence_db (float): Frames whose RMS level is this many dB or more
+                            below the loudest frame are reported as unvoiced
+                            without running YIN (default: -40); None
+                            analyses every frame
     
     Returns:
-        tuple: (times, pitches) where times are frame times in seconds and
-               pitches are detected frequencies in Hz (0 = no pitch detected)
+        tuple: (times, pitches) float32 arrays where times are frame times in
+               seconds and pitches are detected frequencies in Hz (0 = no
+               pitch detected)
+    
+    Raises:
+        ValueError: If method is not 'fft' or 'direct'
     """
+    if method not in ('fft', 'direct'):
+        raise ValueError(f"Unknown YIN method: {method}. Use 'fft' or 'direct'")
+    
     # Calculate lag range based on frequency limits
     lag_min = int(sr / freq_max)
     lag_max = int(sr / freq_min)
     
     # Number of frames
-    n_frames = 1 + (len(audio_samples) - frame_length) // hop_length
+    n_frames = max(0, 1 + (len(audio_samples) - frame_length) // hop_length)
     
-    # Output arrays
-    times = np.arange(n_frames) * hop_length / sr
-    pitches = np.zeros(n_frames)
+    # Output arrays (float32, matching the audio samples)
+    times = (np.arange(n_frames) * hop_length / sr).astype(np.float32)
+    pitches = np.zeros(n_frames, dtype=np.float32)
     
-    # Process each frame
-    for frame_idx in range(n_frames):
-        start = frame_idx * hop_length
-        end = start + frame_length
-        
-        if end > len(audio_samples):
-            break
-            
-        frame = audio_samples[start:end]
-        
-        # YIN algorithm steps
-        # Step 1: Difference function
-        diff = np.zeros(lag_max)
-        for lag in range(lag_min, lag_max):
-            for j in range(frame_length - lag):
-                delta = frame[j] - frame[j + lag]
-                diff[lag] += delta * delta
-        
-        # Step 2: Cumulative mean normalized difference
-        cmnd = np.ones(lag_max)
-        cumsum = 0
-        for lag in range(lag_min, lag_max):
-            cumsum += diff[lag]
-            if cumsum > 0:
-                cmnd[lag] = diff[lag] / (cumsum / lag)
+    if n_frames == 0:
+        return times, pitches
+    
+    # All analysis frames as a zero-copy strided view
+    frames = np.lib.stride_tricks.sliding_window_view(
+        audio_samples, frame_length)[::hop_length]
+    
+    # Silence gate: only frames above the RMS threshold are analysed. The
+    # threshold is relative to the loudest frame, since quiet recordings
+    # are not peak-normalized on load
+    if silence_db is None:
+        active = np.arange(n_frames)
+    else:
+        rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+        active = np.flatnonzero(rms > rms.max() * 10 ** (silence_db / 20))
+    
+    if method == 'direct':
+        # Imported here: the kernels pull in Numba, which is slow to import
+        from _yin_kernels import yin_direct
+        pitches = yin_direct(np.ascontiguousarray(audio_samples, dtype=np.float32),
+                             sr, frame_length, hop_length, n_frames, active,
+                             lag_min, lag_max, threshold)
+        return times, pitches
+    
+    # Process active frames in blocks, one batched FFT per block
+    for block_start in range(0, len(active), _YIN_BLOCK_FRAMES):
+        block_frames = active[block_start:block_start + _YIN_BLOCK_FRAMES]
+        cmnd = _cumulative_mean_normalized_difference(
+            frames[block_frames], lag_min, lag_max)
         
         # Step 3: Absolute threshold
-        # Find the first lag where CMND drops below threshold
-        pitch_lag = None
-        for lag in range(lag_min, lag_max):
-            if cmnd[lag] < threshold:
-                pitch_lag = lag
-                break
+        # Find the first lag where CMND drops below threshold (argmax of a
+        # boolean row returns its first True)
+        below = cmnd[:, lag_min:] < threshold
+        has_pitch = below.any(axis=1)
+        first_lags = lag_min + np.argmax(below, axis=1)
         
         # Step 4: Parabolic interpolation for accuracy
-        if pitch_lag is not None and lag_min < pitch_lag < lag_max - 1:
-            # Refine the lag estimate using parabolic interpolation
-            alpha = cmnd[pitch_lag - 1]
-            beta = cmnd[pitch_lag]
-            gamma = cmnd[pitch_lag + 1]
-            
-            if alpha > beta and gamma > beta:
-                peak_offset = 0.5 * (alpha - gamma) / (alpha - 2 * beta + gamma)
-                refined_lag = pitch_lag + peak_offset
-                pitches[frame_idx] = sr / refined_lag
-            else:
-                pitches[frame_idx] = sr / pitch_lag
-        else:
-            pitches[frame_idx] = 0.0  # No pitch detected
+        # A crossing on either end of the lag range has no neighbours to
+        # interpolate with and is treated as no pitch detected
+        rows = np.flatnonzero(has_pitch & (first_lags > lag_min) & (first_lags < lag_max - 1))
+        pitch_lags = first_lags[rows]
+        alpha = cmnd[rows, pitch_lags - 1]
+        beta = cmnd[rows, pitch_lags]
+        gamma = cmnd[rows, pitch_lags + 1]
+        
+        # Refine only where the crossing is a local minimum
+        is_minimum = (alpha > beta) & (gamma > beta)
+        denom = np.where(is_minimum, alpha - 2 * beta + gamma, 1.0)
+        peak_offset = np.where(is_minimum, 0.5 * (alpha - gamma) / denom, 0.0)
+        pitches[block_frames[rows]] = sr / (pitch_lags + peak_offset)
     
     return times, pitches
 
@@ -109,12 +188,91 @@ def smooth_pitch_track(pitches, kernel_size=5):
     smoothed = pitches.copy()
     non_zero_mask = pitches > 0
     
-    if np.sum(non_zero_mask) > kernel_size:
-        smoothed[non_zero_mask] = medfilt(pitches[non_zero_mask], kernel_size=kernel_size)
+    if np.count_nonzero(non_zero_mask) > kernel_size:
+        smoothed[non_zero_mask] = median_filter(pitches[non_zero_mask], size=kernel_size,
+                                                mode='nearest')
     
     return smoothed
 
 
+@dataclass(eq=False)
+class Notes:
+    """
+    Detected notes stored as parallel NumPy arrays, one entry per note.
+    
+    Column statistics are single array operations (e.g. notes.duration.sum()).
+    Indexing with an integer, or iterating, yields a note dictionary; slices
+    and boolean masks yield a new Notes object.
+    """
+    start_time: np.ndarray
+    end_time: np.ndarray
+    duration: np.ndarray
+    mean_pitch: np.ndarray
+    median_pitch: np.ndarray
+    start_idx: np.ndarray
+    end_idx: np.ndarray
+    
+    def __len__(self):
+        return len(self.start_time)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Notes):
+            return NotImplemented
+        return all(np.array_equal(getattr(self, f.name), getattr(other, f.name))
+                   for f in fields(self))
+    
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return {f.name: getattr(self, f.name)[index].item() for f in fields(self)}
+        return Notes(**{f.name: getattr(self, f.name)[index] for f in fields(self)})
+    
+    def __iter__(self):
+        return iter(self.to_records())
+    
+    def to_records(self):
+        """
+        Convert to a list of note dictionaries.
+        
+        Returns:
+            list: One dictionary per note, keyed by column name
+        """
+        names = [f.name for f in fields(self)]
+        columns = [getattr(self, name).tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _find_note_end(pitches, prefix, start, run_end, pitch_tolerance):
+    """
+    Find where the note starting at `start` ends within a voiced run.
+    
+    A frame ends the note when it strays from the running mean of the frames
+    before it by pitch_tolerance or more. The search scans doubling windows,
+    so its cost is proportional to the length of the note.
+    
+    Args:
+        pitches (np.array): Pitch values in Hz
+        prefix (np.array): Prefix sums of pitches (prefix[0] = 0)
+        start (int): Index of the first frame of the note
+        run_end (int): End (exclusive) of the voiced run
+        pitch_tolerance (float): Pitch tolerance in Hz
+    
+    Returns:
+        int: End index (exclusive) of the note
+    """
+    window = 64
+    lo = start + 1
+    while lo < run_end:
+        hi = min(run_end, lo + window)
+        idx = np.arange(lo, hi)
+        running_mean = (prefix[idx] - prefix[start]) / (idx - start)
+        jumps = np.abs(pitches[lo:hi] - running_mean) >= pitch_tolerance
+        if jumps.any():
+            return lo + int(np.argmax(jumps))
+        lo = hi
+        window *= 2
+    return run_end
+
+
 def segment_notes(times, pitches, min_note_duration=0.1, pitch_tolerance=20):
     """
     Segment the pitch track into individual notes.
@@ -126,80 +284,57 @@ def segment_notes(times, pitches, min_note_duration=0.1, pitch_tolerance=20):
         pitch_tolerance (float): Pitch tolerance in Hz for grouping (default: 20 Hz)
     
     Returns:
-        list: List of note dictionaries with keys:
+        Notes: Detected notes as parallel arrays (start_time, end_time,
+               duration, mean_pitch, median_pitch, start_idx, end_idx).
+               Indexing or iterating yields note dictionaries with keys:
               - 'start_time': Start time in seconds
               - 'end_time': End time in seconds
               - 'duration': Duration in seconds
               - 'mean_pitch': Mean pitch in Hz
               - 'median_pitch': Median pitch in Hz
+              - 'start_idx', 'end_idx': Frame range [start, end) of the note
     """
-    if len(times) == 0 or len(pitches) == 0:
-        return []
-    
-    notes = []
-    current_note = None
-    
-    for i, (time, pitch) in enumerate(zip(times, pitches)):
-        if pitch > 0:  # Voiced frame
-            if current_note is None:
-                # Start a new note
-                current_note = {
-                    'start_time': time,
-                    'start_idx': i,
-                    'pitches': [pitch]
-                }
-            else:
-                # Check if this pitch is similar to current note
-                mean_pitch = np.mean(current_note['pitches'])
-                if abs(pitch - mean_pitch) < pitch_tolerance:
-                    # Continue current note
-                    current_note['pitches'].append(pitch)
-                else:
-                    # End current note and start new one
-                    end_time = times[i - 1] if i > 0 else time
-                    duration = end_time - current_note['start_time']
-                    
-                    if duration >= min_note_duration:
-                        current_note['end_time'] = end_time
-                        current_note['duration'] = duration
-                        current_note['mean_pitch'] = np.mean(current_note['pitches'])
-                        current_note['median_pitch'] = np.median(current_note['pitches'])
-                        notes.append(current_note)
-                    
-                    # Start new note
-                    current_note = {
-                        'start_time': time,
-                        'start_idx': i,
-                        'pitches': [pitch]
-                    }
-        else:  # Unvoiced frame
-            if current_note is not None:
-                # End current note
-                end_time = times[i - 1] if i > 0 else time
-                duration = end_time - current_note['start_time']
-                
-                if duration >= min_note_duration:
-                    current_note['end_time'] = end_time
-                    current_note['duration'] = duration
-                    current_note['mean_pitch'] = np.mean(current_note['pitches'])
-                    current_note['median_pitch'] = np.median(current_note['pitches'])
-                    notes.append(current_note)
-                
-                current_note = None
-    
-    # Handle the last note if it exists
-    if current_note is not None:
-        end_time = times[-1]
-        duration = end_time - current_note['start_time']
-        
-        if duration >= min_note_duration:
-            current_note['end_time'] = end_time
-            current_note['duration'] = duration
-            current_note['mean_pitch'] = np.mean(current_note['pitches'])
-            current_note['median_pitch'] = np.median(current_note['pitches'])
-            notes.append(current_note)
+    times = np.asarray(times)
+    pitches = np.asarray(pitches)
+    
+    # Run-length encode the voicing mask into [start, end) runs of voiced frames
+    voiced = np.concatenate(([0], (pitches > 0).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(voiced))
+    
+    # Prefix sums give the running mean of any frame range in O(1); unvoiced
+    # frames (0 or NaN) add nothing, so a NaN cannot poison later notes
+    voiced_pitches = np.where(pitches > 0, pitches, 0.0)
+    prefix = np.concatenate(([0.0], np.cumsum(voiced_pitches, dtype=np.float64)))
     
-    return notes
+    starts = []
+    ends = []
+    for run_start, run_end in zip(edges[::2], edges[1::2]):
+        start = run_start
+        while start < run_end:
+            end = _find_note_end(pitches, prefix, start, run_end, pitch_tolerance)
+            starts.append(start)
+            ends.append(end)
+            start = end
+    
+    starts = np.array(starts, dtype=np.intp)
+    ends = np.array(ends, dtype=np.intp)
+    
+    # Drop notes shorter than the minimum duration
+    durations = times[ends - 1] - times[starts]
+    keep = durations >= min_note_duration
+    starts, ends, durations = starts[keep], ends[keep], durations[keep]
+    
+    medians = [np.median(pitches[start:end]) for start, end in zip(starts, ends)]
+    
+    return Notes(
+        start_time=times[starts].astype(np.float32),
+        end_time=times[ends - 1].astype(np.float32),
+        duration=durations.astype(np.float32),
+        mean_pitch=((prefix[ends] - prefix[starts]) / (ends - starts)).astype(np.float32),
+        median_pitch=np.array(medians, dtype=np.float32),
+        start_idx=starts,
+        end_idx=ends
+    )
 
 
 def hz_to_midi(freq_hz):
@@ -207,14 +342,30 @@ def hz_to_midi(freq_hz):
     Convert frequency in Hz to MIDI note number.
     
     Args:
-        freq_hz (float): Frequency in Hz
+        freq_hz (float or np.array): Frequency in Hz
     
     Returns:
-        float: MIDI note number (can be fractional for microtones)
+        float or np.array: MIDI note number (can be fractional for microtones);
+                           0 where the frequency is not positive
     """
-    if freq_hz <= 0:
-        return 0
-    return 69 + 12 * np.log2(freq_hz / 440.0)
+    # Plain Python numbers skip the array machinery entirely
+    if isinstance(freq_hz, (int, float)):
+        return 12 * math.log2(freq_hz / 440.0) + 69 if freq_hz > 0 else 0.0
+    
+    freq = np.asarray(freq_hz)
+    # float32 pitch tracks stay float32; anything else is computed in float64
+    if freq.dtype != np.float32:
+        freq = freq.astype(np.float64)
+    voiced = freq > 0
+    
+    midi = np.zeros(freq.shape, dtype=freq.dtype)
+    np.divide(freq, 440.0, out=midi, where=voiced)
+    np.log2(midi, out=midi, where=voiced)
+    midi *= 12
+    midi += 69
+    midi[~voiced] = 0
+    
+    return midi if midi.ndim else float(midi)
 
 
 def midi_to_note_name(midi_number):
@@ -230,11 +381,34 @@ def midi_to_note_name(midi_number):
     if midi_number <= 0:
         return "---"
     
-    note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    octave = int(midi_number // 12) - 1
-    note_idx = int(round(midi_number)) % 12
+    nearest = int(round(midi_number))
+    if nearest < 128:
+        return _MIDI_NOTE_NAMES[nearest]
+    
+    octave = nearest // 12 - 1
+    return f"{_NOTE_LETTERS[nearest % 12]}{octave}"
+
+
+def midi_to_note_names(midi_numbers):
+    """
+    Convert an array of MIDI note numbers to note names.
+    
+    Args:
+        midi_numbers (np.array): MIDI note numbers
+    
+    Returns:
+        np.array: Note names (e.g., "C4", "A4"); "---" where the MIDI number
+                  is not positive
+    """
+    midi = np.asarray(midi_numbers, dtype=np.float64)
+    valid = midi > 0
+    nearest = np.rint(np.where(valid, midi, 0)).astype(np.int64)
     
-    return f"{note_names[note_idx]}{octave}"
+    if np.all(nearest[valid] < 128):
+        names = _MIDI_NOTE_NAME_ARRAY[np.clip(nearest, 0, 127)]
+    else:
+        names = np.char.add(_NOTE_LETTER_ARRAY[nearest % 12], (nearest // 12 - 1).astype(str))
+    return np.where(valid, names, "---")
 
 
 if __name__ == "__main__":
@@ -246,3 +420,4 @@ if __name__ == "__main__":
     print("  - segment_notes(): Segment pitch track into individual notes")
     print("  - hz_to_midi(): Convert Hz to MIDI note number")
     print("  - midi_to_note_name(): Convert MIDI to note name")
+    print("  - midi_to_note_names(): Convert an array of MIDI numbers to note names")
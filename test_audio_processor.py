@@ -61,11 +61,11 @@ def test_with_synthetic_audio():
         duration = 1.0
         frequency = 440.0  # A4 note
         
-        t = np.linspace(0, duration, int(sample_rate * duration))
-        audio_data = np.sin(2 * np.pi * frequency * t)
+        phase = np.arange(int(sample_rate * duration), dtype=np.float32) * np.float32(2 * np.pi * frequency / sample_rate)
+        audio_data = np.sin(phase, out=phase)
         
         # Convert to int16
-        audio_data = (audio_data * 32767).astype(np.int16)
+        audio_data = np.multiply(audio_data, 32767, out=audio_data).astype(np.int16)
         
         # Save to temporary file
         test_file = "test_audio.wav"
@@ -136,6 +136,18 @@ def test_error_handling():
             if os.path.exists("test.xyz"):
                 os.remove("test.xyz")
         
+        # Test with an empty (zero-length) audio file
+        from scipy.io import wavfile
+        wavfile.write("test_empty.wav", 22050, np.zeros(0, dtype=np.int16))
+        try:
+            samples, sr = prepare_audio_input("test_empty.wav")
+        finally:
+            os.remove("test_empty.wav")
+        if len(samples) != 0:
+            print(f"❌ Expected no samples from an empty file, got {len(samples)}")
+            return False
+        print("✅ Empty audio file loaded as an empty array")
+        
         print()
         return True
         
@@ -147,6 +159,186 @@ def test_error_handling():
         return False
 
 
+def test_batch_processing():
+    """Test parallel preparation of several files"""
+    print("=" * 60)
+    print("Test 5: Batch Processing")
+    print("=" * 60)
+    
+    test_files = ["test_batch_1.wav", "test_batch_2.wav"]
+    try:
+        from scipy.io import wavfile
+        from audio_processor import prepare_audio_inputs
+        
+        # Two files of different lengths so the output order can be checked
+        sample_rate = 44100
+        for i, test_file in enumerate(test_files):
+            t = np.arange(int(sample_rate * (i + 1))) / sample_rate
+            audio_data = (np.sin(2 * np.pi * 440.0 * t) * 32767).astype(np.int16)
+            wavfile.write(test_file, sample_rate, audio_data)
+        
+        results = prepare_audio_inputs(test_files, target_sr=22050, max_workers=2)
+        durations = [len(samples) / sr for samples, sr in results]
+        print(f"   Durations: {[f'{d:.2f}s' for d in durations]}")
+        
+        if len(results) != 2 or not (abs(durations[0] - 1.0) < 0.01 and abs(durations[1] - 2.0) < 0.01):
+            print("❌ Batch results are missing or out of order")
+            return False
+        
+        print("✅ Files prepared in parallel and returned in input order")
+        print()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+    
+    finally:
+        for test_file in test_files:
+            if os.path.exists(test_file):
+                os.remove(test_file)
+
+
+def test_audio_cache():
+    """Test that cached audio is reused until the source changes"""
+    print("=" * 60)
+    print("Test 6: Audio Cache")
+    print("=" * 60)
+    
+    import shutil
+    import tempfile
+    cache_dir = tempfile.mkdtemp()
+    test_file = "test_cache.wav"
+    try:
+        from scipy.io import wavfile
+        from audio_processor import prepare_audio_input
+        
+        sample_rate = 22050
+        t = np.arange(sample_rate) / sample_rate
+        wavfile.write(test_file, sample_rate, (np.sin(2 * np.pi * 440.0 * t) * 32767).astype(np.int16))
+        
+        first, _ = prepare_audio_input(test_file, cache_dir=cache_dir)
+        cached, _ = prepare_audio_input(test_file, cache_dir=cache_dir)
+        if len(os.listdir(cache_dir)) != 1 or not np.array_equal(first, cached):
+            print("❌ Second load did not come from the cache")
+            return False
+        print("✅ Second load reused the cached samples")
+        
+        # Rewriting the source with a different length must invalidate the entry
+        wavfile.write(test_file, sample_rate, np.zeros(sample_rate // 2, dtype=np.int16))
+        reloaded, _ = prepare_audio_input(test_file, cache_dir=cache_dir)
+        if len(reloaded) != sample_rate // 2:
+            print("❌ Stale cache entry was returned after the file changed")
+            return False
+        print("✅ Changed source file was decoded again")
+        
+        print()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+    
+    finally:
+        if os.path.exists(test_file):
+            os.remove(test_file)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def test_non_integer_resampling():
+    """Test resampling from a rate that is not a multiple of the target"""
+    print("=" * 60)
+    print("Test 7: 48kHz Resampling")
+    print("=" * 60)
+    
+    test_file = "test_48k.wav"
+    try:
+        from scipy.io import wavfile
+        from audio_processor import prepare_audio_input
+        
+        # 2 seconds at 48kHz: 48000/22050 is not an integer ratio
+        sample_rate = 48000
+        duration = 2.0
+        phase = np.arange(int(sample_rate * duration), dtype=np.float32) * np.float32(2 * np.pi * 440.0 / sample_rate)
+        audio_data = np.sin(phase, out=phase)
+        audio_data = np.multiply(audio_data, 32767, out=audio_data).astype(np.int16)
+        wavfile.write(test_file, sample_rate, audio_data)
+        
+        samples, sr = prepare_audio_input(test_file, target_sr=22050)
+        expected_len = int(duration * 22050)
+        print(f"   Processed sample rate: {sr}Hz, {len(samples)} samples")
+        
+        if sr != 22050 or abs(len(samples) - expected_len) > 1:
+            print(f"❌ Expected 22050Hz and ~{expected_len} samples")
+            return False
+        
+        print("✅ 48kHz input resampled to 22050Hz with the right length")
+        print()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+    
+    finally:
+        if os.path.exists(test_file):
+            os.remove(test_file)
+
+
+def test_stereo_downmix():
+    """Test that stereo input is downmixed to the average of its channels"""
+    print("=" * 60)
+    print("Test 8: Stereo Downmix")
+    print("=" * 60)
+    
+    test_file = "test_stereo.wav"
+    try:
+        from scipy.io import wavfile
+        from audio_processor import prepare_audio_input
+        
+        # 3 seconds at 22050Hz (no resampling), long enough to span
+        # several decoding blocks; different tones on each channel
+        sample_rate = 22050
+        n = 3 * sample_rate
+        phase = np.arange(n, dtype=np.float32) * np.float32(2 * np.pi / sample_rate)
+        left = (np.sin(440.0 * phase) * 20000).astype(np.int16)
+        right = (np.sin(660.0 * phase) * 10000).astype(np.int16)
+        wavfile.write(test_file, sample_rate, np.column_stack([left, right]))
+        
+        samples, sr = prepare_audio_input(test_file, target_sr=22050)
+        expected = (left.astype(np.float32) + right) / 2 / 32768
+        max_error = np.max(np.abs(samples - expected)) if len(samples) == n else np.inf
+        print(f"   Mono samples: {len(samples)}, max error vs channel average: {max_error:.2e}")
+        
+        if max_error > 1e-4:
+            print("❌ Mono output is not the average of the two channels")
+            return False
+        
+        print("✅ Stereo input downmixed to the channel average")
+        print()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+    
+    finally:
+        if os.path.exists(test_file):
+            os.remove(test_file)
+
+
 def main():
     """Run all tests"""
     print("\n" + "=" * 60)
@@ -161,6 +353,10 @@ def main():
     results.append(("Module Imports", test_audio_processor_imports()))
     results.append(("Synthetic Audio", test_with_synthetic_audio()))
     results.append(("Error Handling", test_error_handling()))
+    results.append(("Batch Processing", test_batch_processing()))
+    results.append(("Audio Cache", test_audio_cache()))
+    results.append(("48kHz Resampling", test_non_integer_resampling()))
+    results.append(("Stereo Downmix", test_stereo_downmix()))
     
     # Summary
     print("=" * 60)
@@ -17,7 +17,9 @@ from pitch_detector import (
     smooth_pitch_track,
     segment_notes,
     hz_to_midi,
-    midi_to_note_name
+    midi_to_note_name,
+    midi_to_note_names,
+    Notes
 )
 
 
@@ -33,8 +35,8 @@ def test_pitch_detection_with_sine_wave():
         duration = 1.0
         frequency = 440.0
         
-        t = np.linspace(0, duration, int(sr * duration))
-        samples = np.sin(2 * np.pi * frequency * t).astype(np.float32)
+        phase = np.arange(int(sr * duration), dtype=np.float32) * np.float32(2 * np.pi * frequency / sr)
+        samples = np.sin(phase, out=phase)
         
         # Detect pitch
         times, pitches = yin_pitch_detection(samples, sr, 
@@ -146,14 +148,27 @@ def test_note_segmentation():
                   f"duration: {note['duration']:.2f}s, "
                   f"time: {note['start_time']:.2f}-{note['end_time']:.2f}s")
         
-        if len(notes) == 3:
-            print(f"✅ Correct number of notes detected")
-            print()
-            return True
-        else:
+        if len(notes) != 3:
             print(f"⚠️ Expected 3 notes, got {len(notes)}")
             print()
             return False
+        print(f"✅ Correct number of notes detected")
+        
+        # Unvoiced frames marked with NaN (as librosa.pyin does) must not
+        # leak into the following notes
+        nan_pitches = np.concatenate([np.full(10, np.nan), np.full(15, 200.0), np.full(15, 300.0)])
+        nan_notes = segment_notes(times[:40], nan_pitches,
+                                  min_note_duration=0.1,
+                                  pitch_tolerance=20)
+        
+        if len(nan_notes) != 2 or not np.allclose(nan_notes.mean_pitch, [200.0, 300.0]):
+            print(f"⚠️ NaN-marked silence gave mean pitches {nan_notes.mean_pitch}")
+            print()
+            return False
+        print(f"✅ NaN-marked silence handled")
+        
+        print()
+        return True
             
     except Exception as e:
         print(f"❌ Test failed: {e}")
@@ -196,6 +211,167 @@ def test_frequency_conversions():
             print(f"⚠️ C4 conversion incorrect")
             return False
         
+        # Test array conversion (0 Hz = unvoiced)
+        freqs = np.array([0.0, 261.63, 440.0])
+        midis = hz_to_midi(freqs)
+        names = midi_to_note_names(midis)
+        
+        print(f"   {freqs} Hz → MIDI {midis.round(1)} → {names.tolist()}")
+        
+        if np.allclose(midis, [0, 60, 69], atol=0.1) and list(names) == ["---", "C4", "A4"]:
+            print(f"✅ Array conversion correct")
+        else:
+            print(f"⚠️ Array conversion incorrect")
+            return False
+        
+        print()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+
+
+def test_direct_method_matches_fft():
+    """Test that the direct (reference) YIN method agrees with the FFT method"""
+    print("=" * 60)
+    print("Test 5: Direct vs FFT YIN Method")
+    print("=" * 60)
+    
+    try:
+        # Create a 220Hz sine wave (A3 note) with a silent gap
+        sr = 22050
+        duration = 1.0
+        frequency = 220.0
+        
+        phase = np.arange(int(sr * duration), dtype=np.float32) * np.float32(2 * np.pi * frequency / sr)
+        samples = np.sin(phase, out=phase)
+        samples[8000:14000] = 0.0
+        
+        _, fft_pitches = yin_pitch_detection(samples, sr, method='fft')
+        _, direct_pitches = yin_pitch_detection(samples, sr, method='direct')
+        
+        max_error = np.max(np.abs(fft_pitches - direct_pitches))
+        print(f"✅ Compared {len(fft_pitches)} frames")
+        print(f"   Max difference: {max_error:.4f} Hz")
+        
+        # A lag range longer than the frame (44.1kHz, 20Hz floor -> 2205 lags)
+        hi_sr = 44100
+        hi_phase = np.arange(hi_sr, dtype=np.float32) * np.float32(2 * np.pi * 120.0 / hi_sr)
+        hi_samples = np.sin(hi_phase, out=hi_phase)
+        
+        _, fft_pitches = yin_pitch_detection(hi_samples, hi_sr, freq_min=20, method='fft')
+        _, direct_pitches = yin_pitch_detection(hi_samples, hi_sr, freq_min=20, method='direct')
+        
+        long_lag_error = np.max(np.abs(fft_pitches - direct_pitches))
+        print(f"   Max difference with lags past the frame: {long_lag_error:.4f} Hz")
+        max_error = max(max_error, long_lag_error)
+        
+        if max_error < 0.1:
+            print(f"✅ Methods agree (< 0.1 Hz difference)")
+            print()
+            return True
+        else:
+            print(f"⚠️ Methods disagree (> 0.1 Hz difference)")
+            print()
+            return False
+            
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+
+
+def test_notes_container():
+    """Test column access, indexing and slicing of segmented notes"""
+    print("=" * 60)
+    print("Test 6: Notes Container")
+    print("=" * 60)
+    
+    try:
+        sr = 22050
+        hop_length = 512
+        times = np.arange(60) * hop_length / sr
+        pitches = np.concatenate([
+            np.full(20, 200.0),
+            np.full(20, 300.0),
+            np.full(20, 0.0)
+        ])
+        
+        notes = segment_notes(times, pitches, min_note_duration=0.1, pitch_tolerance=20)
+        
+        print(f"✅ Segmented {len(notes)} notes into {type(notes).__name__}")
+        print(f"   Mean pitches: {notes.mean_pitch}")
+        print(f"   Total duration: {notes.duration.sum():.2f}s")
+        
+        first = notes[0]
+        high = notes[notes.mean_pitch > 250]
+        records = notes.to_records()
+        
+        if (isinstance(notes, Notes) and len(notes) == 2
+                and first['mean_pitch'] == 200.0
+                and first == records[0] and type(first['mean_pitch']) is float
+                and isinstance(high, Notes) and len(high) == 1
+                and high.start_idx[0] == 20
+                and records[1]['end_idx'] == 40
+                and notes == segment_notes(times, pitches) and notes != high):
+            print(f"✅ Column, index and slice access correct")
+            print()
+            return True
+        else:
+            print(f"⚠️ Unexpected Notes contents")
+            print()
+            return False
+            
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        print()
+        return False
+
+
+def test_silence_gate():
+    """Test that the RMS silence gate skips quiet frames relative to the track"""
+    print("=" * 60)
+    print("Test 7: Silence Gate")
+    print("=" * 60)
+    
+    try:
+        # A quiet (-40 dBFS) 220Hz tone followed by the same tone 80 dB lower
+        sr = 22050
+        phase = np.arange(sr, dtype=np.float32) * np.float32(2 * np.pi * 220.0 / sr)
+        samples = np.sin(phase, out=phase)
+        samples[:sr // 2] *= np.float32(0.01)
+        samples[sr // 2:] *= np.float32(1e-6)
+        
+        times, gated = yin_pitch_detection(samples, sr)
+        _, ungated = yin_pitch_detection(samples, sr, silence_db=None)
+        
+        loud = times < 0.4
+        quiet = times > 0.55
+        print(f"   Voiced frames (gated): {np.count_nonzero(gated)}/{len(gated)}")
+        print(f"   Voiced frames (ungated): {np.count_nonzero(ungated)}/{len(ungated)}")
+        
+        if not np.all(gated[loud] > 0):
+            print(f"⚠️ Quiet but pitched frames were gated out")
+            print()
+            return False
+        if np.any(gated[quiet] > 0):
+            print(f"⚠️ Frames 80 dB below the track were not reported as 0")
+            print()
+            return False
+        if not np.all(ungated[quiet] > 0):
+            print(f"⚠️ silence_db=None did not analyse every frame")
+            print()
+            return False
+        
+        print(f"✅ Gate is relative to the track and can be disabled")
         print()
         return True
         
@@ -221,6 +397,9 @@ def main():
     results.append(("Pitch Smoothing", test_pitch_smoothing()))
     results.append(("Note Segmentation", test_note_segmentation()))
     results.append(("Frequency Conversions", test_frequency_conversions()))
+    results.append(("Direct vs FFT Method", test_direct_method_matches_fft()))
+    results.append(("Notes Container", test_notes_container()))
+    results.append(("Silence Gate", test_silence_gate()))
     
     # Summary
     print("=" * 60)